@@ -20,17 +20,108 @@ from typing import Any, Dict
 
 from flask import Flask, abort, jsonify, render_template, request, url_for
 import folium
-from folium.plugins import MarkerCluster
+import numpy as np
+from folium.plugins import FastMarkerCluster
 
 from .config import Config
-from .data_pipeline import ensure_data, load_summary, load_country_detail, top10_countries
-from .utils import fmt_int
+from .data_pipeline import (
+    ensure_data,
+    latest_date_slice,
+    load_country_detail,
+    load_raw,
+    load_summary,
+    top10_countries,
+)
+from .utils import HAS_ORJSON, OrjsonProvider, fmt_int
+
+# Client-side marker factory for FastMarkerCluster: each data row is
+# [lat, lon, country, province_state, confirmed, deaths, recovered] and the
+# popup is assembled in JS, so no per-marker Python objects are created.
+_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+                                {radius: 4, fill: true, fillOpacity: 0.7});
+    var popup = "<b>" + row[2] + "</b><br>" + row[3] + "<br>" +
+        "Confirmed: " + Number(row[4]).toLocaleString() + "<br>" +
+        "Deaths: " + Number(row[5]).toLocaleString() + "<br>" +
+        "Recovered: " + Number(row[6]).toLocaleString();
+    marker.bindPopup(popup, {maxWidth: 300});
+    return marker;
+}
+"""
+
+_ASSETS_DIR = Path(__file__).with_name("assets")
+
+# Folium and Plotly load from CDNs and emit inline scripts/styles; map tiles
+# come from the carto/openstreetmap tile hosts, hence the broad img-src.
+_CSP_POLICY = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' https://cdn.plot.ly https://cdn.jsdelivr.net "
+    "https://cdnjs.cloudflare.com https://code.jquery.com; "
+    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com "
+    "https://code.jquery.com https://netdna.bootstrapcdn.com; "
+    "font-src 'self' https://cdnjs.cloudflare.com https://netdna.bootstrapcdn.com; "
+    "img-src 'self' data: https:; "
+    "frame-src 'self'"
+)
+
+# CSV mtimes behind the current assets/map.html artifact; the map only
+# changes when the underlying data files do.
+_map_artifact_key: tuple | None = None
+
+
+def _map_cache_key(config: Dict) -> tuple:
+    data_dir = Path(config["DATA_DIR"])
+    return tuple(sorted((p.name, p.stat().st_mtime_ns) for p in data_dir.glob("*.csv")))
+
+
+def build_map_html(config: Dict) -> Path:
+    """Write the folium map to assets/map.html, rebuilding only when the CSVs changed.
+
+    The artifact is served by Flask's static route, so /map requests do no
+    per-request map construction and the browser can cache the file.
+    """
+    global _map_artifact_key
+    out = _ASSETS_DIR / "map.html"
+    key = _map_cache_key(config)
+    if key == _map_artifact_key and out.exists():
+        return out
+
+    # Build a folium map centered roughly on [20, 0]
+    fmap = folium.Map(location=[20, 0], zoom_start=2, tiles="cartodbpositron")
+
+    # Plot markers if we have lat/lon in raw data; otherwise center by country centroids unknown
+    # Markers are bulk-loaded via FastMarkerCluster: one vectorized tolist()
+    # instead of building thousands of CircleMarker elements in Python.
+    raw = load_raw(config)
+    if {"lat", "lon"}.issubset(raw.columns):
+        raw = latest_date_slice(raw)
+        # Select rows with coordinates via a NumPy mask; no intermediate
+        # DataFrame copy from dropna, just column arrays indexed once.
+        lat = raw["lat"].to_numpy()
+        lon = raw["lon"].to_numpy()
+        idx = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))[:5000]  # safety limit
+        # tolist() unboxes numpy scalars to plain Python values for folium's
+        # JSON serialization.
+        columns = [lat[idx].tolist(), lon[idx].tolist()] + [
+            raw[c].to_numpy()[idx].tolist()
+            for c in ("country", "province_state", "confirmed", "deaths", "recovered")
+        ]
+        data = list(map(list, zip(*columns)))
+        FastMarkerCluster(
+            data=data, callback=_MARKER_CALLBACK, name="COVID-19 Countries"
+        ).add_to(fmap)
+
+    folium.LayerControl().add_to(fmap)
+    fmap.save(str(out))
+    _map_artifact_key = key
+    return out
 
 
 def create_app(config_object: Any | None = None) -> Flask:
     app = Flask(
         __name__,
-        template_folder=str(Path(__file__).with_name("templates")),
+        template_folder=str(Path(__file__).resolve().parents[1] / "templates"),
         static_folder=str(Path(__file__).with_name("assets")),
         static_url_path="/assets",
     )
@@ -41,8 +132,13 @@ def create_app(config_object: Any | None = None) -> Flask:
     else:
         app.config.from_object(config_object)
 
-    # Ensure data available
+    # Fast JSON encoding for the API routes when orjson is installed.
+    if HAS_ORJSON:
+        app.json = OrjsonProvider(app)
+
+    # Ensure data available and prebuild the map artifact
     ensure_data(app.config)
+    build_map_html(app.config)
 
     # ------------------------------- ROUTES ------------------------------- #
     @app.route("/")
@@ -56,50 +152,18 @@ def create_app(config_object: Any | None = None) -> Flask:
         }
         return render_template(
             "index.html",
-            by_country=by_country.head(50).to_dict(orient="records"),
-            timeseries=by_date.to_dict(orient="records"),
+            # itertuples avoids materializing a dict per table row; the
+            # timeseries goes to the client as one pre-serialized JSON blob.
+            by_country=by_country.nlargest(50, "confirmed").itertuples(index=False),
+            timeseries_json=by_date.to_json(orient="records", date_format="iso"),
             top10=top10.to_dict(orient="records"),
             totals=totals,
         )
 
     @app.route("/map")
     def map_view():
-        by_country, _ = load_summary(app.config)
-        # Build a folium map centered roughly on [20, 0]
-        fmap = folium.Map(location=[20, 0], zoom_start=2, tiles="cartodbpositron")
-        cluster = MarkerCluster(name="COVID-19 Countries").add_to(fmap)
-
-        # Plot markers if we have lat/lon in raw data; otherwise center by country centroids unknown
-        # We'll attach popup with summary numbers.
-        # For lack of per-country lat/lon, we won't drop markers. If dataset has lat/lon rows, those will appear.
-        # Iterate through raw-level rows for better spatial coverage.
-        from .data_pipeline import load_raw
-
-        raw = load_raw(app.config)
-        if {"lat", "lon"}.issubset(raw.columns):
-            latest_date = raw["date"].max() if "date" in raw.columns else None
-            if latest_date is not None:
-                raw = raw[raw["date"] == latest_date]
-            raw_geo = raw.dropna(subset=["lat", "lon"])[:5000]  # safety limit
-            for _, row in raw_geo.iterrows():
-                popup_html = f"""
-                <b>{row.get('country','Unknown')}</b><br>
-                {row.get('province_state','')}<br>
-                Confirmed: {fmt_int(row.get('confirmed'))}<br>
-                Deaths: {fmt_int(row.get('deaths'))}<br>
-                Recovered: {fmt_int(row.get('recovered'))}
-                """
-                folium.CircleMarker(
-                    location=[row["lat"], row["lon"]],
-                    radius=4,
-                    fill=True,
-                    fill_opacity=0.7,
-                    popup=folium.Popup(popup_html, max_width=300),
-                ).add_to(cluster)
-
-        folium.LayerControl().add_to(fmap)
-        map_html = fmap._repr_html_()
-        return render_template("map.html", map_html=map_html)
+        build_map_html(app.config)  # no-op unless the CSVs changed
+        return render_template("map.html")
 
     @app.route("/country/<name>")
     def country_detail(name: str):
@@ -114,7 +178,7 @@ def create_app(config_object: Any | None = None) -> Flask:
         return render_template(
             "country.html",
             country=name,
-            rows=df.to_dict(orient="records"),
+            rows=df.itertuples(index=False),
             totals=totals,
         )
 
@@ -126,4 +190,9 @@ def create_app(config_object: Any | None = None) -> Flask:
     def not_found(_):
         return render_template("404.html"), 404
 
+    @app.after_request
+    def set_csp(response):
+        response.headers.setdefault("Content-Security-Policy", _CSP_POLICY)
+        return response
+
     return app
\ No newline at end of file
@@ -41,4 +41,7 @@ class Config:
 
 class TestConfig(Config):
     TESTING = True
-    DEBUG = True
\ No newline at end of file
+    DEBUG = True
+    # Offline fixture dataset; keeps tests from downloading into the real
+    # data directory.
+    DATA_DIR = str(BASE_DIR / "tests" / "fixtures")
\ No newline at end of file
@@ -15,10 +15,31 @@ Shared utility helpers: caching, formatting, JSON responses.
 ===========================================================================
 """
 from __future__ import annotations
-from functools import lru_cache
 from typing import Any, Dict
 
 import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Serializes numpy scalars natively (no Python int/float boxing) and is
+    several times faster than stdlib json for the small API payloads.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
 
 
 def to_int(x: Any, default: int = 0) -> int:
@@ -37,6 +58,8 @@ def fmt_int(n: int | float | None) -> str:
         return str(n)
 
 
-@lru_cache(maxsize=8)
 def top_n(df: pd.DataFrame, col: str, n: int = 10) -> pd.DataFrame:
-    return df.sort_values(col, ascending=False).head(n).copy()
\ No newline at end of file
+    # Note: DataFrames are unhashable, so this cannot be lru_cached; callers
+    # that need memoization cache the result themselves (see data_pipeline).
+    # nlargest is a partial heap-select: O(N log n) vs a full O(N log N) sort.
+    return df.nlargest(n, col).copy()
\ No newline at end of file
@@ -11,10 +11,11 @@ License: MIT License (see LICENSE file for details)
 ===========================================================================
 """
 from covid_dashboard import create_app
+from covid_dashboard.config import TestConfig
 
 
 def test_app_creation():
-    app = create_app()
+    app = create_app(TestConfig)
     assert app is not None
     client = app.test_client()
     r = client.get("/")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+===========================================================================
+Project: COVID-19 Spread Analysis with Flask
+File: tests/test_data_pipeline.py
+Author: Mobin Yousefi (GitHub: github.com/mobinyousefi-cs)
+Created: 2025-10-29
+Updated: 2025-10-29
+License: MIT License (see LICENSE file for details)
+===========================================================================
+"""
+import covid_dashboard.data_pipeline as dp
+
+CSV_HEADER = (
+    "SNo,ObservationDate,Province/State,Country/Region,Last Update,"
+    "Confirmed,Deaths,Recovered,Latitude,Longitude\n"
+)
+
+
+def test_read_any_csv_coerces_junk_values(tmp_path, monkeypatch):
+    # A non-numeric count past the first chunk fails the typed read during
+    # iteration; the file must be retried without dtypes so every coercible
+    # row survives instead of being truncated at the bad chunk.
+    rows = [
+        "1,01/22/2020,Anhui,Mainland China,1/22/2020 17:00,1,0,0,31.8,117.2\n",
+        "2,01/22/2020,Beijing,Mainland China,1/22/2020 17:00,14,0,0,40.1,116.4\n",
+        "3,01/23/2020,Anhui,Mainland China,1/23/2020 17:00,9,0,0,31.8,117.2\n",
+        "4,01/23/2020,,Japan,1/23/2020 17:00,oops,1,0,36.2,138.2\n",
+        "5,01/24/2020,Anhui,Mainland China,1/24/2020 17:00,15,0,0,31.8,117.2\n",
+        "6,01/24/2020,,Japan,1/24/2020 17:00,2,0,1,36.2,138.2\n",
+    ]
+    (tmp_path / "covid_19_data.csv").write_text(CSV_HEADER + "".join(rows))
+    monkeypatch.setattr(dp, "CSV_CHUNK_ROWS", 2)
+
+    df = dp._read_any_csv(tmp_path)
+
+    assert len(df) == len(rows)
+    # The junk value coerces to 0 rather than dropping the row or its file.
+    japan = df[df["country"] == "Japan"]
+    assert japan["confirmed"].tolist() == [0, 2]